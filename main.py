@@ -1,6 +1,8 @@
+import multiprocessing
 import numpy as np
 import pygame
 import sys
+from shared_board import EMPTY_CELL, FOOD_CELL, SNAKE_BODY_CELL, SNAKE_HEAD_CELL, SharedBoard, run_simulation
 from snake import Game
 from snake_solver import Solver
 
@@ -21,33 +23,107 @@ class Button:
         screen.blit(self.surface, self.surface.get_rect(center=(self.center_x, self.center_y)))
 
 
+class BoardRenderer:
+    # Draws the whole board with a handful of calls, regardless of its size. Every cell (including the walls) is a single
+    # pixel in a small image, which is scaled up so that every pixel becomes the size of a cell. The grid lines, which
+    # never change, are drawn only once on a transparent overlay that is put on top of the scaled image.
+
+    WALL_CELL = 4
+
+    def __init__(self, rows, columns):
+        self.palette = np.zeros((5, 3), dtype=np.uint8)
+        self.palette[EMPTY_CELL] = empty_cell_color
+        self.palette[SNAKE_BODY_CELL] = snake_color
+        self.palette[SNAKE_HEAD_CELL] = snake_color
+        self.palette[FOOD_CELL] = food_color
+        self.palette[self.WALL_CELL] = wall_color
+
+        self.cells = np.empty((columns + 2, rows + 2), dtype=np.uint8)
+        self.cell_surface = pygame.Surface(self.cells.shape)
+        self.scaled_surface = pygame.Surface((self.cells.shape[0] * CELL_SIZE, self.cells.shape[1] * CELL_SIZE))
+
+        self.grid_overlay = pygame.Surface(self.scaled_surface.get_size(), pygame.SRCALPHA)
+        self.grid_overlay.fill((0, 0, 0, 0))
+
+        for i in range(rows):
+            for j in range(columns):
+                rect = pygame.Rect((j + 1) * CELL_SIZE, (i + 1) * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+                pygame.draw.rect(self.grid_overlay, grid_line_color, rect, CELL_BORDER)
+
+    def render(self, game):
+        cells = self.cells
+        cells.fill(self.WALL_CELL)
+        cells[1:-1, 1:-1] = EMPTY_CELL
+
+        # The cells array includes the walls, so the coordinates of the game are offset by one
+        body = game.get_snake_body_coordinates()
+
+        if len(body) > 0:
+            body = np.asarray(body, dtype=np.intp)
+            cells[body[:, 0] + 1, body[:, 1] + 1] = SNAKE_BODY_CELL
+
+        food = game.get_food_coordinates()
+        cells[int(food[0]) + 1, int(food[1]) + 1] = FOOD_CELL
+
+        head = game.get_snake_head_coordinates()
+        cells[int(head[0]) + 1, int(head[1]) + 1] = SNAKE_HEAD_CELL
+
+        pygame.surfarray.blit_array(self.cell_surface, self.palette[cells])
+        pygame.transform.scale(self.cell_surface, self.scaled_surface.get_size(), self.scaled_surface)
+
+        screen.blit(self.scaled_surface, (0, 0))
+        screen.blit(self.grid_overlay, (0, 0))
+
+
 def main_menu():
     play_button = Button("\u2022 Play", font_48, SCREEN_WIDTH / 2, SCREEN_HEIGHT / 3, WHITE, BLACK, play)
     solve_button = Button("\u2022 Watch AI play", font_48, SCREEN_WIDTH / 2, SCREEN_HEIGHT * 2 / 3, WHITE, BLACK, solve)
+    buttons = [play_button, solve_button]
+
+    hovered_button = get_button_at_mouse(buttons)
+    needs_redraw = True
 
     running = True
 
+    # The menu is only redrawn when something changes and otherwise sleeps until the next event arrives, so that it
+    # does not use any CPU while idle
     while running:
-        screen.fill(BLACK)
-        play_button.render()
-        solve_button.render()
+        if needs_redraw:
+            screen.fill(BLACK)
 
-        if mouse_is_at_button(play_button):
-            draw_hover_effect(play_button)
-        elif mouse_is_at_button(solve_button):
-            draw_hover_effect(solve_button)
+            for button in buttons:
+                button.render()
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
+            if hovered_button is not None:
+                draw_hover_effect(hovered_button)
 
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                if mouse_is_at_button(play_button):
-                    play_button.on_click()
-                elif mouse_is_at_button(solve_button):
-                    solve_button.on_click()
+            pygame.display.flip()
+            needs_redraw = False
 
-        pygame.display.flip()
+        event = pygame.event.wait()
+
+        if event.type == pygame.QUIT:
+            running = False
+
+        elif event.type == pygame.MOUSEMOTION:
+            button = get_button_at_mouse(buttons)
+
+            if button is not hovered_button:
+                hovered_button = button
+                needs_redraw = True
+
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            button = get_button_at_mouse(buttons)
+
+            if button is not None:
+                button.on_click()
+
+                # The game has drawn over the menu, and the mouse may have moved in the meantime
+                hovered_button = get_button_at_mouse(buttons)
+                needs_redraw = True
+
+        elif event.type == pygame.WINDOWEXPOSED:
+            needs_redraw = True
 
 
 def play():
@@ -76,11 +152,7 @@ def play():
         if not game.update():
             running = False
 
-        screen.fill(empty_cell_color)
-        draw_grid()
-        draw_snake(game.get_snake_head_coordinates(), game.get_snake_body_coordinates())
-        draw_food(game.get_food_coordinates())
-        draw_walls()
+        board_renderer.render(game)
         render_score(game.get_score())
 
         pygame.display.flip()
@@ -91,6 +163,10 @@ def play():
 
 
 def solve():
+    if SOLVE_IN_SEPARATE_PROCESS:
+        solve_in_separate_process()
+        return
+
     solver = Solver(N_ROWS, N_COLUMNS)
 
     running = True
@@ -106,11 +182,7 @@ def solve():
         if not solver.solve():
             running = False
 
-        screen.fill(empty_cell_color)
-        draw_grid()
-        draw_snake(solver.get_snake_head_coordinates(), solver.get_snake_body_coordinates())
-        draw_food(solver.get_food_coordinates())
-        draw_walls()
+        board_renderer.render(solver)
         render_score(solver.get_score())
 
         pygame.display.flip()
@@ -120,104 +192,105 @@ def solve():
     game_over(solver.get_score())
 
 
-def game_over(score):
-    transparent_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-    transparent_overlay.fill(BLACK)
-    transparent_overlay.set_alpha(192)
-    screen.blit(transparent_overlay, (0, 0))
-
-    rendered_game_over = font_48.render("Game Over!", True, WHITE)
-    rendered_score = font_36.render(f"Score: {score}", True, WHITE)
-
-    screen.blit(rendered_game_over, rendered_game_over.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT * 1 / 3)))
-    screen.blit(rendered_score, rendered_score.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT * 2 / 3)))
+def solve_in_separate_process():
+    # The solver plays in its own process and publishes every state to a shared board, which is read each frame. This
+    # way, the solver never has to wait for the screen to be drawn.
+    board = SharedBoard(N_ROWS, N_COLUMNS)
+    frame = board.create_frame()
 
-    pygame.display.flip()
+    simulation = multiprocessing.Process(target=run_simulation, args=(board.get_name(), N_ROWS, N_COLUMNS, SNAKE_SPEED), daemon=True)
+    simulation.start()
 
-    time_at_game_over = pygame.time.get_ticks()
+    drawn_tick = None
 
     running = True
 
     while running:
+
         for event in pygame.event.get():
             # Did the user click the window close button?
             if event.type == pygame.QUIT:
+                simulation.terminate()
+                board.close()
+                board.unlink()
                 pygame.quit()
                 sys.exit()
 
-        current_time = pygame.time.get_ticks()
+        # Check whether the solver is still running before reading the board, so that the last state it published is
+        # still shown when it stopped without reporting a game over (e.g. because it crashed). Reading gives up when the
+        # solver dies in the middle of publishing a state.
+        simulation_is_alive = simulation.is_alive()
+
+        frame_is_complete = board.read(frame, simulation.is_alive) is not None
 
-        # Show the game over screen for 5 seconds before moving on
-        if current_time - time_at_game_over > 5000:
+        if not frame_is_complete or frame.is_game_over() or not simulation_is_alive:
             running = False
 
+        # Only draw the board when the solver has published a new state since the last frame
+        if frame_is_complete and frame.is_published() and frame.get_tick() != drawn_tick:
+            board_renderer.render(frame)
+            render_score(frame.get_score())
 
-def mouse_is_at_button(button):
-    return button.center_y - button.size[1] / 2 <= pygame.mouse.get_pos()[1] <= button.center_y + button.size[1] / 2
+            pygame.display.flip()
 
+            drawn_tick = frame.get_tick()
 
-def draw_hover_effect(button):
-    rect = pygame.Rect(button.center_x - button.size[0] / 2, button.center_y - button.size[1] / 2, button.size[0], button.size[1])
-    pygame.draw.rect(screen, button_hover_color, rect, 5, 10)
-
+        clock.tick(FRAME_RATE)
 
-def array_to_screen_coordinates(coordinates_in_array):
-    # As each cell drawn on the screen is larger than 1 pixel, this function converts the array coordinates of a cell to
-    # the top left pixel coordinates corresponding to that cell on the screen
-    coordinates_on_screen = coordinates_in_array * CELL_SIZE + CELL_SIZE
-    return coordinates_on_screen
+    simulation.join()
+    board.close()
+    board.unlink()
 
+    game_over(frame.get_score())
 
-def draw_outer_filled_square(coordinates_on_screen, color):
-    rect = pygame.Rect(coordinates_on_screen[0], coordinates_on_screen[1], CELL_SIZE, CELL_SIZE)
-    pygame.draw.rect(screen, color, rect, 0)
 
+def game_over(score):
+    transparent_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    transparent_overlay.fill(BLACK)
+    transparent_overlay.set_alpha(192)
+    screen.blit(transparent_overlay, (0, 0))
 
-def draw_inner_filled_square(coordinates_on_screen, color):
-    rect = pygame.Rect(coordinates_on_screen[0] + CELL_BORDER, coordinates_on_screen[1] + CELL_BORDER, CELL_SIZE - 2 * CELL_BORDER, CELL_SIZE - 2 * CELL_BORDER)
-    pygame.draw.rect(screen, color, rect, 0)
+    rendered_game_over = font_48.render("Game Over!", True, WHITE)
+    rendered_score = font_36.render(f"Score: {score}", True, WHITE)
 
+    screen.blit(rendered_game_over, rendered_game_over.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT * 1 / 3)))
+    screen.blit(rendered_score, rendered_score.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT * 2 / 3)))
 
-def draw_open_square(coordinates_on_screen, color):
-    rect = pygame.Rect(coordinates_on_screen[0], coordinates_on_screen[1], CELL_SIZE, CELL_SIZE)
-    pygame.draw.rect(screen, color, rect, CELL_BORDER)
+    pygame.display.flip()
 
+    # Show the game over screen for a while before moving on, sleeping until either the timer runs out or the window is
+    # closed
+    pygame.time.set_timer(GAME_OVER_TIMER_EVENT, GAME_OVER_DURATION, loops=1)
 
-def draw_snake(snake_head_coordinates, snake_body_coordinates):
-    coordinates_on_screen = array_to_screen_coordinates(snake_head_coordinates)
-    draw_inner_filled_square(coordinates_on_screen, snake_color)
+    running = True
 
-    for coordinates in snake_body_coordinates:
-        coordinates_on_screen = array_to_screen_coordinates(coordinates)
-        draw_inner_filled_square(coordinates_on_screen, snake_color)
+    while running:
+        event = pygame.event.wait()
 
+        # Did the user click the window close button?
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
 
-def draw_food(food_coordinates):
-    coordinates_on_screen = array_to_screen_coordinates(food_coordinates)
-    draw_inner_filled_square(coordinates_on_screen, food_color)
+        if event.type == GAME_OVER_TIMER_EVENT:
+            running = False
 
 
-def draw_walls():
-    for i in range(-1, N_ROWS + 1):
-        coordinates_on_screen = array_to_screen_coordinates(np.array([-1, i]))
-        draw_outer_filled_square(coordinates_on_screen, wall_color)
+def mouse_is_at_button(button):
+    return button.center_y - button.size[1] / 2 <= pygame.mouse.get_pos()[1] <= button.center_y + button.size[1] / 2
 
-        coordinates_on_screen = array_to_screen_coordinates(np.array([N_ROWS, i]))
-        draw_outer_filled_square(coordinates_on_screen, wall_color)
 
-    for j in range(-1, N_COLUMNS + 1):
-        coordinates_on_screen = array_to_screen_coordinates(np.array([j, -1]))
-        draw_outer_filled_square(coordinates_on_screen, wall_color)
+def get_button_at_mouse(buttons):
+    for button in buttons:
+        if mouse_is_at_button(button):
+            return button
 
-        coordinates_on_screen = array_to_screen_coordinates(np.array([j, N_COLUMNS]))
-        draw_outer_filled_square(coordinates_on_screen, wall_color)
+    return None
 
 
-def draw_grid():
-    for i in range(N_ROWS):
-        for j in range(N_COLUMNS):
-            coordinates_on_screen = array_to_screen_coordinates(np.array([j, i]))
-            draw_open_square(coordinates_on_screen, WHITE)
+def draw_hover_effect(button):
+    rect = pygame.Rect(button.center_x - button.size[0] / 2, button.center_y - button.size[1] / 2, button.size[0], button.size[1])
+    pygame.draw.rect(screen, button_hover_color, rect, 5, 10)
 
 
 def render_score(score):
@@ -241,6 +314,14 @@ SCREEN_WIDTH = (N_COLUMNS + 2) * CELL_SIZE
 SCREEN_HEIGHT = (N_ROWS + 2) * CELL_SIZE
 
 SNAKE_SPEED = 10
+FRAME_RATE = 60
+
+# Duration in milliseconds that the game over screen is shown
+GAME_OVER_DURATION = 5000
+GAME_OVER_TIMER_EVENT = pygame.USEREVENT + 1
+
+# Whether the solver plays in a separate process, rather than in between drawing the frames
+SOLVE_IN_SEPARATE_PROCESS = False
 
 empty_cell_color = BLACK
 grid_line_color = WHITE
@@ -249,16 +330,21 @@ snake_color = GREEN
 food_color = RED
 button_hover_color = YELLOW
 
-pygame.init()
+# The screen is only set up when running the application itself, not when this module is imported by the process the
+# solver runs in
+if __name__ == "__main__":
+    pygame.init()
+
+    pygame.display.set_caption("Snake")
 
-pygame.display.set_caption("Snake")
+    clock = pygame.time.Clock()
 
-clock = pygame.time.Clock()
+    screen = pygame.display.set_mode([SCREEN_WIDTH, SCREEN_HEIGHT])
 
-screen = pygame.display.set_mode([SCREEN_WIDTH, SCREEN_HEIGHT])
+    font_48 = pygame.font.SysFont("Sys", 48)
+    font_36 = pygame.font.SysFont("Sys", 36)
+    font_24 = pygame.font.SysFont("Sys", 24)
 
-font_48 = pygame.font.SysFont("Sys", 48)
-font_36 = pygame.font.SysFont("Sys", 36)
-font_24 = pygame.font.SysFont("Sys", 24)
+    board_renderer = BoardRenderer(N_ROWS, N_COLUMNS)
 
-main_menu()
+    main_menu()
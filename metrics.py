@@ -0,0 +1,289 @@
+import argparse
+import json
+import math
+import numpy as np
+import random
+from collections import Counter
+from snake_solver import Solver
+
+# Causes of the end of a game, in the order in which they are encoded in the binary format. New causes must be added at
+# the end, so that existing files keep their meaning. "full" means the snake filled the area in which food can spawn.
+DEATH_CAUSES = ["wall", "body", "timeout", "full"]
+
+# Layout of a single record in the binary format. Every record has the same size, so that records can be read in large
+# chunks and every field of a chunk is available as an array.
+RECORD_DTYPE = np.dtype([
+    ("seed", "<i8"),
+    ("rows", "<i4"),
+    ("columns", "<i4"),
+    ("score", "<i4"),
+    ("ticks", "<i8"),
+    ("death_cause", "u1"),
+    ("planning_time", "<f8"),
+    ("planning_count", "<i8"),
+])
+
+RECORDS_PER_CHUNK = 65536
+
+
+class MetricsSink:
+    # Writes one record per game to a file, either as JSON lines ("jsonl") or as fixed-size binary records ("binary").
+    # Records are buffered and written in batches, so that only a batch of records is ever held in memory.
+
+    def __init__(self, path, format="jsonl", buffer_size=1024):
+        if format not in ("jsonl", "binary"):
+            raise ValueError(f"Unknown metrics format: {format}")
+
+        self.format = format
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.file = open(path, "w" if format == "jsonl" else "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record):
+        if self.format == "jsonl":
+            self.buffer.append(json.dumps(record, separators=(",", ":")))
+        else:
+            self.buffer.append(tuple(DEATH_CAUSES.index(record[name]) if name == "death_cause" else record[name] for name in RECORD_DTYPE.names))
+
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer == []:
+            return
+
+        if self.format == "jsonl":
+            self.file.write("\n".join(self.buffer) + "\n")
+        else:
+            np.array(self.buffer, dtype=RECORD_DTYPE).tofile(self.file)
+
+        self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class StreamingDistribution:
+    # Keeps track of how often every value occurs, so that percentiles can be computed without storing all values. For
+    # integer metrics the counts are exact. For continuous metrics a <relative_precision> can be given, in which case
+    # values are grouped into logarithmic buckets and every percentile is off by at most that fraction.
+
+    def __init__(self, relative_precision=None):
+        self.relative_precision = relative_precision
+        self.counts = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, values):
+        values = np.asarray(values)
+
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, values.min().item())
+        self.maximum = max(self.maximum, values.max().item())
+
+        if self.relative_precision is not None:
+            values = self.to_buckets(values)
+
+        unique_values, counts = np.unique(values, return_counts=True)
+        self.counts.update(dict(zip(unique_values.tolist(), counts.tolist())))
+
+    def to_buckets(self, values):
+        # Values up to zero share a single bucket, positive values are put into buckets whose bounds grow geometrically
+        base = math.log1p(self.relative_precision)
+        buckets = np.full(len(values), -math.inf)
+        positive = values > 0
+        buckets[positive] = np.floor(np.log(values[positive]) / base)
+        return buckets
+
+    def from_bucket(self, bucket):
+        if bucket == -math.inf:
+            return 0.0
+
+        # Use the middle of the bucket as its value
+        base = math.log1p(self.relative_precision)
+        return math.exp((bucket + 0.5) * base)
+
+    def get_percentile(self, percentile):
+        if self.count == 0:
+            return None
+
+        # The nearest-rank method: the smallest value for which at least <percentile> percent of the values are not
+        # larger
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        cumulative_count = 0
+
+        for value in sorted(self.counts):
+            cumulative_count += self.counts[value]
+
+            if cumulative_count >= rank:
+                if self.relative_precision is not None:
+                    return min(max(self.from_bucket(value), self.minimum), self.maximum)
+
+                return value
+
+    def summarize(self, percentiles):
+        if self.count == 0:
+            return {"count": 0}
+
+        summary = {"count": self.count, "mean": self.total / self.count, "min": self.minimum, "max": self.maximum}
+
+        for percentile in percentiles:
+            summary[f"p{percentile:g}"] = self.get_percentile(percentile)
+
+        return summary
+
+
+def read_metrics(path, format="jsonl"):
+    # Yields the records in the file in chunks, as a dictionary of arrays per chunk
+    if format == "jsonl":
+        with open(path) as file:
+            chunk = []
+
+            for line in file:
+                if line.strip() != "":
+                    chunk.append(json.loads(line))
+
+                if len(chunk) >= RECORDS_PER_CHUNK:
+                    yield records_to_columns(chunk)
+                    chunk = []
+
+            if chunk != []:
+                yield records_to_columns(chunk)
+
+    elif format == "binary":
+        with open(path, "rb") as file:
+            while True:
+                records = np.fromfile(file, dtype=RECORD_DTYPE, count=RECORDS_PER_CHUNK)
+
+                if len(records) == 0:
+                    break
+
+                columns = {name: records[name] for name in RECORD_DTYPE.names}
+                columns["death_cause"] = np.array(DEATH_CAUSES)[records["death_cause"]]
+                yield columns
+
+    else:
+        raise ValueError(f"Unknown metrics format: {format}")
+
+
+def records_to_columns(records):
+    return {name: np.array([record[name] for record in records]) for name in RECORD_DTYPE.names}
+
+
+def summarize_metrics(path, format="jsonl", percentiles=(50, 90, 99)):
+    # Summarizes all records in the file in a single pass, holding only a single chunk of records in memory at a time
+    distributions = {
+        "score": StreamingDistribution(),
+        "ticks": StreamingDistribution(),
+        "planning_time": StreamingDistribution(relative_precision=0.01),
+        "planning_time_per_plan": StreamingDistribution(relative_precision=0.01),
+    }
+    death_causes = Counter()
+    games = 0
+
+    for columns in read_metrics(path, format):
+        games += len(columns["score"])
+
+        distributions["score"].add(columns["score"])
+        distributions["ticks"].add(columns["ticks"])
+        distributions["planning_time"].add(columns["planning_time"])
+
+        planned = columns["planning_count"] > 0
+        distributions["planning_time_per_plan"].add(columns["planning_time"][planned] / columns["planning_count"][planned])
+
+        death_causes.update(columns["death_cause"].tolist())
+
+    summary = {"games": games, "death_causes": dict(death_causes)}
+
+    for name, distribution in distributions.items():
+        summary[name] = distribution.summarize(percentiles)
+
+    return summary
+
+
+def play_game(seed, rows, columns, max_ticks=None, max_ticks_without_food=None):
+    # Let the solver play a single game without drawing it and return the record of that game. The solver can end up
+    # following its tail forever without ever reaching the food, so a game also ends (as a timeout) when no food has been
+    # eaten for <max_ticks_without_food> ticks, which defaults to twice the number of cells on the board.
+    if max_ticks_without_food is None:
+        max_ticks_without_food = 2 * rows * columns
+
+    random.seed(seed)
+    solver = Solver(rows, columns)
+
+    ticks = 0
+    ticks_at_last_food = 0
+    death_cause = "timeout"
+
+    while (max_ticks is None or ticks < max_ticks) and ticks - ticks_at_last_food < max_ticks_without_food:
+        ticks += 1
+        score_before = solver.get_score()
+
+        if not solver.solve():
+            death_cause = solver.get_collision_cause()
+
+            # Without a collision, the game ended because there is no room left for the food
+            if death_cause is None:
+                death_cause = "full"
+
+            break
+
+        if solver.get_score() > score_before:
+            ticks_at_last_food = ticks
+
+    return {
+        "seed": seed,
+        "rows": rows,
+        "columns": columns,
+        "score": solver.get_score(),
+        "ticks": ticks,
+        "death_cause": death_cause,
+        "planning_time": solver.planning_time,
+        "planning_count": solver.planning_count,
+    }
+
+
+def evaluate(sink, games, rows, columns, first_seed=0, max_ticks=None, max_ticks_without_food=None):
+    for seed in range(first_seed, first_seed + games):
+        sink.write(play_game(seed, rows, columns, max_ticks, max_ticks_without_food))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the solver without drawing and summarize the results.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help="play games and write one record per game")
+    evaluate_parser.add_argument("path")
+    evaluate_parser.add_argument("--games", type=int, default=100)
+    evaluate_parser.add_argument("--rows", type=int, default=20)
+    evaluate_parser.add_argument("--columns", type=int, default=20)
+    evaluate_parser.add_argument("--first-seed", type=int, default=0)
+    evaluate_parser.add_argument("--max-ticks", type=int, default=None)
+    evaluate_parser.add_argument("--max-ticks-without-food", type=int, default=None, help="defaults to twice the number of cells")
+    evaluate_parser.add_argument("--format", choices=["jsonl", "binary"], default="jsonl")
+
+    summarize_parser = subparsers.add_parser("summarize", help="compute statistics over the records in a file")
+    summarize_parser.add_argument("path")
+    summarize_parser.add_argument("--format", choices=["jsonl", "binary"], default="jsonl")
+
+    arguments = parser.parse_args()
+
+    if arguments.command == "evaluate":
+        with MetricsSink(arguments.path, arguments.format) as metrics_sink:
+            evaluate(metrics_sink, arguments.games, arguments.rows, arguments.columns, arguments.first_seed, arguments.max_ticks, arguments.max_ticks_without_food)
+    else:
+        print(json.dumps(summarize_metrics(arguments.path, arguments.format), indent=4))
@@ -0,0 +1,172 @@
+import numpy as np
+import time
+from multiprocessing import shared_memory
+from snake_solver import Solver
+
+# Values of the cells in the board grid
+EMPTY_CELL = 0
+SNAKE_BODY_CELL = 1
+SNAKE_HEAD_CELL = 2
+FOOD_CELL = 3
+
+# Positions of the fields in the header that precedes the board grid in the shared memory block
+VERSION = 0
+TICK = 1
+SCORE = 2
+HEAD_X = 3
+HEAD_Y = 4
+FOOD_X = 5
+FOOD_Y = 6
+IS_GAME_OVER = 7
+HEADER_LENGTH = 8
+
+# The tick in the header until the first state has been published
+UNPUBLISHED_TICK = -1
+
+
+class SharedBoard:
+    # The state of a game in a shared memory block, so that a game running in one process can be shown by another
+    # process. The block consists of a header of integers followed by the board grid, with one byte per cell that can be
+    # indexed with [x, y] like the coordinates used by the game.
+    #
+    # Only a single process may publish to the board. Publishing never waits for readers: the version in the header is
+    # made odd while a new state is being written and even again once it is complete (a seqlock). A reader copies the
+    # state and retries whenever the version was odd or changed during the copy, so that it never sees a half-written
+    # state.
+
+    def __init__(self, rows, columns, name=None):
+        header_size = HEADER_LENGTH * np.dtype(np.int64).itemsize
+
+        # Create a new shared memory block if no name is given, otherwise attach to the existing block with that name
+        if name is None:
+            self.shared_memory = shared_memory.SharedMemory(create=True, size=header_size + rows * columns)
+        else:
+            self.shared_memory = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((HEADER_LENGTH,), dtype=np.int64, buffer=self.shared_memory.buf)
+        self.cells = np.ndarray((columns, rows), dtype=np.uint8, buffer=self.shared_memory.buf, offset=header_size)
+
+        if name is None:
+            self.header.fill(0)
+            self.header[TICK] = UNPUBLISHED_TICK
+            self.cells.fill(EMPTY_CELL)
+
+    def get_name(self):
+        return self.shared_memory.name
+
+    def publish(self, game, tick, is_game_over=False):
+        header = self.header
+        cells = self.cells
+
+        header[VERSION] += 1
+
+        cells.fill(EMPTY_CELL)
+
+        for coordinates in game.get_snake_body_coordinates():
+            cells[coordinates[0], coordinates[1]] = SNAKE_BODY_CELL
+
+        food = game.get_food_coordinates()
+        cells[food[0], food[1]] = FOOD_CELL
+
+        # After colliding with a wall, the head is outside the board and is therefore not part of the grid
+        head = game.get_snake_head_coordinates()
+
+        if game.grid.coordinates_to_index(head) is not None:
+            cells[head[0], head[1]] = SNAKE_HEAD_CELL
+
+        header[TICK] = tick
+        header[SCORE] = game.get_score()
+        header[HEAD_X] = head[0]
+        header[HEAD_Y] = head[1]
+        header[FOOD_X] = food[0]
+        header[FOOD_Y] = food[1]
+        header[IS_GAME_OVER] = is_game_over
+
+        header[VERSION] += 1
+
+    def read(self, frame, is_publisher_alive=None):
+        # Copy the current state into <frame>, retrying until the copy is not interrupted by the publisher. When the
+        # publisher dies while publishing, the version stays odd forever, so if <is_publisher_alive> is given, it is
+        # checked before every retry and None is returned once it reports that the publisher is gone.
+        header = self.header
+
+        while True:
+            version = int(header[VERSION])
+
+            if version % 2 == 0:
+                np.copyto(frame.header, header)
+                np.copyto(frame.cells, self.cells)
+
+                if int(header[VERSION]) == version:
+                    return frame
+
+            if is_publisher_alive is not None and not is_publisher_alive():
+                return None
+
+            time.sleep(0)
+
+    def create_frame(self):
+        return BoardFrame(self.cells.shape[1], self.cells.shape[0])
+
+    def close(self):
+        # The views on the shared memory must be released before the block itself can be closed
+        del self.header
+        del self.cells
+        self.shared_memory.close()
+
+    def unlink(self):
+        self.shared_memory.unlink()
+
+
+class BoardFrame:
+    # A copy of the state of a SharedBoard, offering the same getters as the game so that it can be drawn in the same way
+
+    def __init__(self, rows, columns):
+        self.header = np.zeros(HEADER_LENGTH, dtype=np.int64)
+        self.header[TICK] = UNPUBLISHED_TICK
+        self.cells = np.zeros((columns, rows), dtype=np.uint8)
+
+    def get_tick(self):
+        return int(self.header[TICK])
+
+    def is_published(self):
+        return self.get_tick() != UNPUBLISHED_TICK
+
+    def get_score(self):
+        return int(self.header[SCORE])
+
+    def is_game_over(self):
+        return bool(self.header[IS_GAME_OVER])
+
+    def get_snake_head_coordinates(self):
+        return self.header[HEAD_X:HEAD_Y + 1].copy()
+
+    def get_snake_body_coordinates(self):
+        return np.argwhere(self.cells == SNAKE_BODY_CELL)
+
+    def get_food_coordinates(self):
+        return self.header[FOOD_X:FOOD_Y + 1].copy()
+
+
+def run_simulation(name, rows, columns, ticks_per_second=None):
+    # Let the solver play a game and publish every state to the shared board with the given name. When
+    # <ticks_per_second> is None, the game is played as fast as possible.
+    board = SharedBoard(rows, columns, name)
+    solver = Solver(rows, columns)
+
+    tick = 0
+    board.publish(solver, tick)
+
+    next_tick_time = time.perf_counter()
+    running = True
+
+    while running:
+        running = solver.solve()
+        tick += 1
+        board.publish(solver, tick, not running)
+
+        if ticks_per_second is not None:
+            next_tick_time += 1 / ticks_per_second
+            time.sleep(max(0.0, next_tick_time - time.perf_counter()))
+
+    board.close()
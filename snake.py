@@ -1,3 +1,4 @@
+import copy
 from enum import Enum
 import numpy as np
 import random
@@ -108,6 +109,16 @@ class Game:
     def get_score(self):
         return self.score
 
+    def copy(self):
+        # Create an independent copy of the game state, so that moves can be simulated on the copy without affecting
+        # this game. The grid is never modified and can therefore be shared between the copies.
+        game = self.__class__.__new__(self.__class__)
+        game.grid = self.grid
+        game.snake = copy.deepcopy(self.snake)
+        game.food = copy.deepcopy(self.food)
+        game.score = self.score
+        return game
+
     def spawn_snake(self):
         empty_cells = self.get_empty_cells()
         chosen_cell = random.choice(empty_cells)
@@ -137,8 +148,14 @@ class Game:
 
     def respawn_food(self):
         empty_cells = self.get_empty_cells()
+
+        # There is no room left for the food once the snake fills the whole area in which food can spawn
+        if empty_cells == []:
+            return False
+
         chosen_cell = random.choice(empty_cells)
         self.food.set_coordinates(chosen_cell)
+        return True
 
     def snake_go_north(self):
         delta_coordinates = self.snake.head_coordinates - self.snake.head_coordinates_previous
@@ -169,18 +186,21 @@ class Game:
             self.snake.set_orientation(Orientation.WEST)
 
     def check_collision(self):
+        return self.get_collision_cause() is not None
+
+    def get_collision_cause(self):
         snake = self.snake
 
         # Check if snake collides with own body
         for body_part_i_coordinates in snake.body_coordinates:
             if np.array_equal(snake.head_coordinates, body_part_i_coordinates):
-                return True
+                return "body"
 
         # Check if snake collides with walls
         if snake.head_coordinates[0] < 0 or snake.head_coordinates[0] > self.grid.columns - 1 or snake.head_coordinates[1] < 0 or snake.head_coordinates[1] > self.grid.rows - 1:
-            return True
+            return "wall"
 
-        return False
+        return None
 
     def cell_is_empty(self, coordinates):
         snake = self.snake
@@ -217,12 +237,15 @@ class Game:
 
         self.snake.update_position()
 
+        food_is_respawned = True
+
         if np.array_equal(self.snake.head_coordinates, self.food.coordinates):
             self.snake.eat_food()
             self.score += 1
-            self.respawn_food()
+            food_is_respawned = self.respawn_food()
 
         if self.check_collision():
             return False
 
-        return True
+        # The game also ends when the snake has filled the board
+        return food_is_respawned
@@ -1,4 +1,12 @@
+import multiprocessing
 import numpy as np
+import os
+import pickle
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
 from snake import Game, Orientation
 
 
@@ -6,11 +14,24 @@ class Solver(Game):
     def __init__(self, rows, columns):
         super().__init__(rows, columns)
         self.target_queue = []
+        # Total time spent on determining paths and the number of paths determined
+        self.planning_time = 0.0
+        self.planning_count = 0
+
+    def copy(self):
+        solver = super().copy()
+        solver.target_queue = list(self.target_queue)
+        solver.planning_time = self.planning_time
+        solver.planning_count = self.planning_count
+        return solver
 
     def solve(self):
         # If the snake currently does not have a path to follow, determine what path to follow
         if self.target_queue == []:
+            planning_start_time = time.perf_counter()
             self.target_queue = self.determine_path_to_take()
+            self.planning_time += time.perf_counter() - planning_start_time
+            self.planning_count += 1
 
         # If the snake has a path to follow, navigate to the first element in the path
         if self.target_queue != []:
@@ -282,3 +303,431 @@ class Dijkstra:
 
     def get_path(self):
         return self.path
+
+
+# Offsets from a cell to its neighbors to the north, east, south and west respectively
+NEIGHBOR_OFFSETS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+
+
+class ParallelSolver(Solver):
+    # Instead of committing to a single path, this solver generates several candidate plans for every decision (the
+    # shortest path to the food, detours to the food via each neighbor of the head, and following the tail). Every
+    # candidate is simulated on a copy of the game in a pool of worker processes, after which the best scoring plan
+    # that finished within the deadline is taken.
+
+    CANDIDATE_PLANS = [("food", None), ("tail", None)] + [("detour", offset) for offset in NEIGHBOR_OFFSETS]
+
+    def __init__(self, rows, columns, max_workers=None, deadline=0.5):
+        super().__init__(rows, columns)
+        self.deadline = deadline
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count()
+        # The id of the snapshot of the decision currently being made, or 0 when no decision is being made. Workers
+        # check it to stop evaluating candidates as soon as their decision is over.
+        self.current_snapshot_id = multiprocessing.Value("q", 0, lock=False)
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=initialize_worker, initargs=(self.current_snapshot_id,))
+        self.pending_futures = []
+        self.snapshot_id = 0
+        self.snapshot_memory = None
+
+    def determine_path_to_take(self):
+        start_time = time.perf_counter()
+        snapshot_size = self.publish_snapshot()
+        self.current_snapshot_id.value = self.snapshot_id
+
+        # Candidates are only handed to workers that are not still busy with candidates of earlier decisions, as they
+        # would otherwise wait in the queue until after the deadline
+        self.pending_futures = [future for future in self.pending_futures if not future.done()]
+        idle_workers = max(0, self.max_workers - len(self.pending_futures))
+
+        futures = [self.executor.submit(evaluate_candidate_plan, self.snapshot_id, self.snapshot_memory.name, snapshot_size, candidate) for candidate in self.CANDIDATE_PLANS[:idle_workers]]
+
+        # The path the regular solver would take is determined while the workers evaluate the candidates, so that it
+        # is available right away if none of the candidates turn out to be usable
+        fallback_path = super().determine_path_to_take()
+
+        done, not_done = wait(futures, timeout=max(0.0, self.deadline - (time.perf_counter() - start_time)))
+
+        # Workers stop evaluating the remaining candidates as soon as they notice the decision is over
+        self.current_snapshot_id.value = 0
+
+        for future in not_done:
+            future.cancel()
+
+        self.pending_futures.extend(not_done)
+
+        best_path = []
+        best_score = None
+
+        # The futures are considered in the order of the candidates, so that ties are always broken the same way. Errors
+        # in the workers are raised here instead of silently falling back to the regular solver.
+        for future in futures:
+            if future not in done:
+                continue
+
+            path, score = future.result()
+
+            if score is not None and (best_score is None or score > best_score):
+                best_path = path
+                best_score = score
+
+        # If none of the candidates could be evaluated in time or all of them lead to a collision, fall back to the path
+        # the regular solver would take
+        if best_score is None:
+            return fallback_path
+
+        return best_path
+
+    def publish_snapshot(self):
+        # The game state is pickled once per decision into a shared memory block, from which every worker loads it once
+        # and keeps it around for the remaining candidates of the same decision. The block of the previous decision is
+        # released, as workers that are still evaluating candidates of that decision no longer matter.
+        snapshot = pickle.dumps(self.copy())
+
+        self.release_snapshot()
+        self.snapshot_memory = shared_memory.SharedMemory(create=True, size=len(snapshot))
+        self.snapshot_memory.buf[:len(snapshot)] = snapshot
+        self.snapshot_id += 1
+
+        return len(snapshot)
+
+    def release_snapshot(self):
+        if self.snapshot_memory is not None:
+            self.snapshot_memory.close()
+            self.snapshot_memory.unlink()
+            self.snapshot_memory = None
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.release_snapshot()
+
+
+# State of a worker process of the ParallelSolver, holding the most recently loaded game state and the id of the
+# snapshot of the decision the ParallelSolver is currently making
+worker_snapshot_id = None
+worker_snapshot = None
+worker_current_snapshot_id = None
+
+
+def initialize_worker(current_snapshot_id):
+    global worker_current_snapshot_id
+    worker_current_snapshot_id = current_snapshot_id
+
+
+def evaluate_candidate_plan(snapshot_id, snapshot_name, snapshot_size, candidate):
+    global worker_snapshot_id, worker_snapshot
+
+    # Candidates of a decision that is already over are not evaluated (any further)
+    if worker_current_snapshot_id.value != snapshot_id:
+        return [], None
+
+    if snapshot_id != worker_snapshot_id:
+        snapshot_memory = shared_memory.SharedMemory(name=snapshot_name)
+
+        try:
+            worker_snapshot = pickle.loads(bytes(snapshot_memory.buf[:snapshot_size]))
+        finally:
+            snapshot_memory.close()
+
+        worker_snapshot_id = snapshot_id
+
+    solver = worker_snapshot.copy()
+    path = build_candidate_plan(solver, candidate)
+
+    if path == [] or worker_current_snapshot_id.value != snapshot_id:
+        return path, None
+
+    score = simulate_plan(solver, path)
+
+    return path, score
+
+
+def build_candidate_plan(solver, candidate):
+    kind, offset = candidate
+
+    head = solver.get_snake_head_coordinates()
+    food = solver.get_food_coordinates()
+    body = solver.get_snake_body_coordinates()
+    blocked = solver.get_currently_blocked_cells()
+
+    if kind == "food":
+        return solver.calculate_path_between(head, food, blocked)
+
+    if kind == "tail":
+        # Same as the regular solver, the tail is only worth following when the snake is long enough to trap itself
+        if len(body) + 1 > 2:
+            return solver.calculate_path_between(head, body[-1], blocked[:-1])
+
+        return []
+
+    if kind == "detour":
+        first_step = head + np.array(offset)
+
+        if solver.grid.coordinates_to_index(first_step) is None or np.any(np.all(first_step == blocked, axis=1)):
+            return []
+
+        if np.array_equal(first_step, food):
+            return [first_step]
+
+        # After the first step, the cell the head currently occupies can no longer be entered
+        path_from_first_step_to_food = solver.calculate_path_between(first_step, food, blocked + [head])
+
+        if path_from_first_step_to_food == []:
+            return []
+
+        return [first_step] + path_from_first_step_to_food
+
+    return []
+
+
+def simulate_plan(solver, path):
+    # Simulate the plan on the (copied) game and score the resulting state. Plans that end in a collision get no score.
+    # Otherwise, plans are compared on whether the tail is still reachable afterward, whether the food was eaten, how
+    # many cells the head can still reach and finally how short the plan is.
+    score_before = solver.get_score()
+
+    for target_coordinates in path:
+        solver.determine_next_move(target_coordinates)
+
+        if not solver.update():
+            return None
+
+    has_eaten_food = solver.get_score() > score_before
+
+    head = solver.get_snake_head_coordinates()
+    body = solver.get_snake_body_coordinates()
+
+    if len(body) < 2:
+        tail_is_reachable = True
+    else:
+        tail_is_reachable = solver.calculate_path_between(head, body[-1], solver.get_currently_blocked_cells()[:-1]) != []
+
+    return tail_is_reachable, has_eaten_food, count_reachable_cells(solver), -len(path)
+
+
+def count_reachable_cells(game):
+    grid = game.grid
+    head = game.get_snake_head_coordinates()
+    occupied = set(grid.coordinates_to_index(coordinates) for coordinates in game.get_snake_body_coordinates())
+
+    start = grid.coordinates_to_index(head)
+    visited = {start}
+    queue = deque([head])
+
+    while queue:
+        current = queue.popleft()
+
+        for offset in NEIGHBOR_OFFSETS:
+            neighbor = current + np.array(offset)
+            neighbor_index = grid.coordinates_to_index(neighbor)
+
+            if neighbor_index is None or neighbor_index in visited or neighbor_index in occupied:
+                continue
+
+            visited.add(neighbor_index)
+            queue.append(neighbor)
+
+    return len(visited) - 1
+
+
+class RolloutSolver(Game):
+    # Instead of planning a path, this solver runs many short playouts from the current state for every possible move
+    # and takes the move with the best survival rate, using the food eaten during the playouts to break ties. The
+    # playouts are run on a RolloutSimulator, as simulating them on copies of the game itself would be far too slow.
+
+    def __init__(self, rows, columns, rollout_count=300, rollout_depth=40, greedy_probability=0.75, seed=None):
+        super().__init__(rows, columns)
+        self.rollout_count = rollout_count
+        self.rollout_depth = rollout_depth
+        self.greedy_probability = greedy_probability
+        self.random = random.Random(seed)
+        # Total time spent on determining moves and the number of moves determined
+        self.planning_time = 0.0
+        self.planning_count = 0
+
+    def copy(self):
+        solver = super().copy()
+        solver.rollout_count = self.rollout_count
+        solver.rollout_depth = self.rollout_depth
+        solver.greedy_probability = self.greedy_probability
+        solver.random = random.Random()
+        solver.random.setstate(self.random.getstate())
+        solver.planning_time = self.planning_time
+        solver.planning_count = self.planning_count
+        return solver
+
+    def solve(self):
+        planning_start_time = time.perf_counter()
+        simulator = RolloutSimulator.from_game(self)
+        direction = self.determine_best_direction(simulator)
+        self.planning_time += time.perf_counter() - planning_start_time
+        self.planning_count += 1
+
+        [self.snake_go_north, self.snake_go_east, self.snake_go_south, self.snake_go_west][direction]()
+
+        return self.update()
+
+    def determine_best_direction(self, simulator):
+        directions = simulator.get_possible_directions()
+        rollouts_per_direction = max(1, self.rollout_count // len(directions))
+
+        best_direction = simulator.direction
+        best_statistics = None
+
+        for direction in directions:
+            survived = 0
+            food_eaten = 0
+
+            for _ in range(rollouts_per_direction):
+                steps, eaten = simulator.rollout(direction, self.rollout_depth, self.random, self.greedy_probability)
+
+                if steps == self.rollout_depth:
+                    survived += 1
+
+                food_eaten += eaten
+
+            statistics = (survived / rollouts_per_direction, food_eaten / rollouts_per_direction)
+
+            if best_statistics is None or statistics > best_statistics:
+                best_direction = direction
+                best_statistics = statistics
+
+        return best_direction
+
+
+class RolloutSimulator:
+    # A stripped-down version of the game that stores its state in plain integers, so that playouts can be simulated
+    # quickly. Cells are identified by their index in the grid (see Grid.coordinates_to_index) and directions by their
+    # position in NEIGHBOR_OFFSETS (i.e. 0 is north, 1 is east, 2 is south and 3 is west).
+
+    def __init__(self, rows, columns, cells, food, direction, is_growing=False):
+        self.rows = rows
+        self.columns = columns
+        # The cells occupied by the snake, starting at the head
+        self.cells = deque(cells)
+        self.occupied = bytearray(rows * columns)
+        self.food = food
+        self.direction = direction
+        self.is_growing = is_growing
+
+        for cell in self.cells:
+            self.occupied[cell] = 1
+
+    @classmethod
+    def from_game(cls, game):
+        grid = game.grid
+        snake = game.snake
+
+        cells = [int(grid.coordinates_to_index(snake.head_coordinates))]
+
+        for coordinates in snake.body_coordinates:
+            cells.append(int(grid.coordinates_to_index(coordinates)))
+
+        food = int(grid.coordinates_to_index(game.food.coordinates))
+        direction = snake.orientation.value - 1
+
+        return cls(grid.rows, grid.columns, cells, food, direction, snake.has_eaten_food)
+
+    def get_possible_directions(self):
+        # The snake cannot reverse its direction
+        return [direction for direction in range(4) if direction != (self.direction + 2) % 4]
+
+    def get_neighbor(self, cell, direction):
+        # Returns the index of the neighboring cell in the given direction, or None if that neighbor is a wall
+        x, y = divmod(cell, self.rows)
+
+        if direction == 0:
+            return cell - 1 if y > 0 else None
+        if direction == 1:
+            return cell + self.rows if x < self.columns - 1 else None
+        if direction == 2:
+            return cell + 1 if y < self.rows - 1 else None
+
+        return cell - self.rows if x > 0 else None
+
+    def spawn_food(self, occupied, rng):
+        # Same as the game, food is only spawned in cells not adjacent to the walls. Random cells are tried first, as
+        # this is much faster than listing all empty cells as long as the board is not nearly full.
+        rows = self.rows
+        columns = self.columns
+
+        for _ in range(32):
+            cell = rng.randint(1, columns - 2) * rows + rng.randint(1, rows - 2)
+
+            if not occupied[cell]:
+                return cell
+
+        empty_cells = [x * rows + y for x in range(1, columns - 1) for y in range(1, rows - 1) if not occupied[x * rows + y]]
+
+        if empty_cells == []:
+            return None
+
+        return rng.choice(empty_cells)
+
+    def rollout(self, first_direction, depth, rng, greedy_probability):
+        # Play the game for at most <depth> steps, starting with <first_direction>. Afterward, the snake moves towards
+        # the food with a probability of <greedy_probability> and in a random direction otherwise, while avoiding
+        # moves that immediately collide. Returns the number of steps survived and the amount of food eaten.
+        rows = self.rows
+        get_neighbor = self.get_neighbor
+        random_value = rng.random
+        choice = rng.choice
+
+        cells = deque(self.cells)
+        occupied = bytearray(self.occupied)
+        head = cells[0]
+        food = self.food
+        food_x, food_y = divmod(food, rows)
+        direction = first_direction
+        is_growing = self.is_growing
+        eaten = 0
+
+        for step in range(depth):
+            if step == 0:
+                new_head = get_neighbor(head, direction)
+            else:
+                safe_moves = []
+
+                for candidate_direction in range(4):
+                    if candidate_direction == (direction + 2) % 4:
+                        continue
+
+                    neighbor = get_neighbor(head, candidate_direction)
+
+                    if neighbor is not None and not occupied[neighbor]:
+                        safe_moves.append((candidate_direction, neighbor))
+
+                if safe_moves == []:
+                    return step, eaten
+
+                if random_value() < greedy_probability:
+                    direction, new_head = min(safe_moves, key=lambda move: abs(move[1] // rows - food_x) + abs(move[1] % rows - food_y))
+                else:
+                    direction, new_head = choice(safe_moves)
+
+            if new_head is None:
+                return step, eaten
+
+            if is_growing:
+                is_growing = False
+            else:
+                occupied[cells.pop()] = 0
+
+            if occupied[new_head]:
+                return step, eaten
+
+            occupied[new_head] = 1
+            cells.appendleft(new_head)
+            head = new_head
+
+            if head == food:
+                eaten += 1
+                is_growing = True
+                food = self.spawn_food(occupied, rng)
+
+                # If there is no room left for food, the snake has filled the board
+                if food is None:
+                    return depth, eaten
+
+                food_x, food_y = divmod(food, rows)
+
+        return depth, eaten